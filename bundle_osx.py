@@ -1,20 +1,49 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 import argparse
+import ctypes
+import errno
+import fcntl
 import glob
+import hashlib
+import json
 import logging
 import shutil
 import stat
 import subprocess
 import sys
-from datetime import datetime
-from os import chmod, environ, listdir, lstat, makedirs, path, remove, symlink
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from os import (
+    chmod,
+    close,
+    environ,
+    getpid,
+    link,
+    listdir,
+    lstat,
+    makedirs,
+    path,
+    readlink,
+    remove,
+    replace,
+    strerror,
+    symlink,
+    utime,
+    walk,
+)
 from time import time
-from typing import List
+from typing import Dict, Iterator, List, Optional, Tuple
 from urllib.request import urlretrieve
 
 MINICONDA_URL = "https://repo.anaconda.com/miniconda/Miniconda3-latest-MacOSX-x86_64.sh"
 CONDA_BASE = ""
+# fallback timestamp for --reproducible builds when SOURCE_DATE_EPOCH is not set
+# (1980-01-01, the earliest date representable in most archive formats)
+DEFAULT_SOURCE_DATE_EPOCH = 315532800
+# libc clonefile(2), resolved on first use by _clonefile (False if unavailable)
+CLONEFILE = None
 
 
 def safe_conda_base(buildpath: str) -> str:
@@ -61,6 +90,28 @@ def install_conda(buildpath: str) -> str:
     return conda_dir
 
 
+def source_date_epoch() -> int:
+    """Return the timestamp to use for all files in a reproducible build.
+
+    Honors the ``SOURCE_DATE_EPOCH`` environment variable (see
+    https://reproducible-builds.org/specs/source-date-epoch/), and falls back to
+    ``DEFAULT_SOURCE_DATE_EPOCH`` when it is not set.
+
+    Returns
+    -------
+    int
+        seconds since the unix epoch
+    """
+    value = environ.get("SOURCE_DATE_EPOCH", "")
+    if not value:
+        return DEFAULT_SOURCE_DATE_EPOCH
+    try:
+        return int(value)
+    except ValueError:
+        logging.critical(f"SOURCE_DATE_EPOCH must be an integer, got: {value!r}")
+        sys.exit(1)
+
+
 def conda_run(args: List[str], env_name: str = "base"):
     """Run a command from the conda base (or ``env_name``).
 
@@ -164,8 +215,378 @@ def create_env(
     return env_dir
 
 
+def _clonefile(src: str, dest: str) -> bool:
+    """Create a copy-on-write clone of ``src`` at ``dest`` (APFS only).
+
+    Returns ``False`` if cloning is not supported on this platform or filesystem, and
+    raises ``OSError`` for any other failure.
+    """
+    global CLONEFILE
+    if CLONEFILE is None:
+        CLONEFILE = False
+        if sys.platform == "darwin":
+            libc = ctypes.CDLL(None, use_errno=True)
+            CLONEFILE = getattr(libc, "clonefile", False)
+    if not CLONEFILE:
+        return False
+    if CLONEFILE(src.encode(), dest.encode(), 0) == 0:
+        return True
+    err = ctypes.get_errno()
+    if err in (errno.EXDEV, errno.ENOTSUP, errno.EOPNOTSUPP):
+        return False
+    raise OSError(err, strerror(err), dest)
+
+
+class FileStore:
+    """Content-addressed file store shared by all builds on a host.
+
+    Files are hashed (sha256) and stored once under ``objects/``, then materialized
+    into conda environments and app bundles.  With ``link_mode="clone"`` files are
+    materialized as copy-on-write clones where the filesystem supports it (APFS),
+    which share disk blocks but not the page cache.  With ``link_mode="hardlink"``
+    they share the inode (and thus the page cache) with the stored object.  Either
+    mode falls back to a hardlink, and then to a plain copy (e.g. when the store is
+    on a different device).  Copies are reported but not counted as savings.
+    Because hardlinks share their inode with the stored object, files in the store
+    must never be modified in place: use ``detach_tree`` before doing so.
+
+    Materialized files also share the mtime of their object, which is the time it
+    was ingested.  Timestamp-based .pyc files would therefore be stale, so the
+    bytecode of anything deduplicated must be compiled with hash-based invalidation
+    first (see ``compile_bytecode``).
+
+    Objects are keyed by content and permission bits, so materialized files keep
+    the mode of the original.  Each build records the objects it uses in ``refs/``,
+    along with the directories (roots) they were materialized into and the inodes
+    of the materialized files, so that later builds can skip re-hashing them.
+    ``gc`` drops refs whose roots no longer exist and then deletes all unreferenced
+    objects.  Builds hold a shared lock on the store while loading refs and
+    ingesting, and ``gc`` holds an exclusive one.
+
+    Parameters
+    ----------
+    root : str
+        Directory of the store.  Will be created if it does not exist.
+    link_mode : str, optional
+        How to materialize files, either "clone" or "hardlink", by default "clone"
+    """
+
+    def __init__(self, root: str, link_mode: str = "clone"):
+        assert link_mode in ("clone", "hardlink"), f"Invalid link_mode: {link_mode}"
+        self.root = path.abspath(path.expanduser(root))
+        self.link_mode = link_mode
+        self.objects_dir = path.join(self.root, "objects")
+        self.refs_dir = path.join(self.root, "refs")
+        self.tmp_dir = path.join(self.root, "tmp")
+        for folder in (self.objects_dir, self.refs_dir, self.tmp_dir):
+            makedirs(folder, exist_ok=True)
+        # file key -> object path, so that no file is hashed twice
+        self._known: Dict[tuple, str] = {}
+        # file key -> object name, for files materialized from the store by previous
+        # builds (see ``load_refs``) and by this one
+        self._materialized: Dict[tuple, str] = {}
+        self._files: Dict[tuple, str] = {}
+        # file key -> object name, for files that had to be copied instead
+        self._copied: Dict[tuple, str] = {}
+
+    def load_refs(self):
+        """Load the files materialized by previous builds, so they are not re-hashed.
+
+        Must be called while holding ``lock``, so that ``gc`` cannot remove refs or
+        objects in the meantime.
+        """
+        for ref in self._live_refs():
+            if not ref["live"]:
+                continue
+            for *key, obj_name in ref["files"]:
+                obj_path = self._object_path(obj_name)
+                if path.exists(obj_path):
+                    self._known[tuple(key)] = obj_path
+                    self._materialized[tuple(key)] = obj_name
+
+    @staticmethod
+    def _key(st) -> tuple:
+        return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _object_path(self, obj_name: str) -> str:
+        return path.join(self.objects_dir, obj_name[:2], obj_name)
+
+    @contextmanager
+    def lock(self, exclusive: bool = False) -> Iterator[None]:
+        """Hold a shared (or exclusive) lock on the store."""
+        with open(path.join(self.root, "lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def ingest(self, filepath: str) -> str:
+        """Add the file at ``filepath`` to the store.
+
+        Safe to call concurrently from multiple builds: the object is written to a
+        temporary file first and then atomically linked into place.
+
+        Parameters
+        ----------
+        filepath : str
+            path of a regular file to add.
+
+        Returns
+        -------
+        str
+            path of the stored object
+        """
+        st = lstat(filepath)
+        obj_path = self._known.get(self._key(st))
+        if obj_path is not None and not path.exists(obj_path):
+            obj_path = None  # removed by gc since it was cached
+        if obj_path is None:
+            digest = _hash_file(filepath).hexdigest()
+            mode = stat.S_IMODE(st.st_mode)
+            # hardlinks share permissions, so the mode is part of the object name
+            obj_path = self._object_path(f"{digest}.{mode:o}")
+            if not path.exists(obj_path):
+                makedirs(path.dirname(obj_path), exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=self.tmp_dir)
+                close(fd)
+                try:
+                    shutil.copyfile(filepath, tmp)
+                    chmod(tmp, mode)
+                    link(tmp, obj_path)
+                except FileExistsError:
+                    pass  # another build stored the same object first
+                finally:
+                    remove(tmp)
+            self._known[self._key(st)] = obj_path
+            # files hardlinked to the object share its inode
+            self._known[self._key(lstat(obj_path))] = obj_path
+        return obj_path
+
+    def materialize(self, obj_path: str, dest: str):
+        """Place the stored object at ``obj_path`` at ``dest``.
+
+        Depending on ``link_mode``, tries a copy-on-write clone and/or a hardlink,
+        then falls back to a copy if the filesystem supports neither (or the object
+        has too many links).  An existing file at ``dest`` is replaced atomically.
+        """
+        target = dest
+        if path.lexists(dest):
+            target = f"{dest}.{getpid()}.store-tmp"
+            if path.lexists(target):
+                remove(target)
+        copied = False
+        if self.link_mode == "hardlink" or not _clonefile(obj_path, target):
+            try:
+                link(obj_path, target)
+            except OSError as e:
+                unsupported = (errno.EXDEV, errno.EMLINK, errno.EPERM, errno.ENOTSUP)
+                if e.errno not in unsupported:
+                    raise
+                if not self._copied:
+                    logging.warning(f"Copying files from store instead of linking: {e}")
+                shutil.copy2(obj_path, target)
+                copied = True
+        if target != dest:
+            replace(target, dest)
+        key = self._key(lstat(dest))
+        self._known[key] = obj_path
+        if copied:
+            self._copied[key] = path.basename(obj_path)
+        else:
+            self._files[key] = path.basename(obj_path)
+
+    def copy(self, src: str, dest: str) -> str:
+        """Drop-in replacement for ``shutil.copy`` that goes through the store."""
+        if path.isdir(dest):
+            dest = path.join(dest, path.basename(src))
+        self.materialize(self.ingest(src), dest)
+        return dest
+
+    def dedupe_tree(self, root: str):
+        """Replace every regular file under ``root`` with its stored object.
+
+        Files that were materialized from the store by a previous build (and have
+        not changed since) are left alone.
+        """
+        logging.info(f"Deduplicating {root} into file store {self.root}")
+        for dirpath, _, filenames in walk(root):
+            for name in filenames:
+                filepath = path.join(dirpath, name)
+                st = lstat(filepath)
+                if not stat.S_ISREG(st.st_mode):
+                    continue
+                obj_path = self.ingest(filepath)
+                key = self._key(st)
+                if key in self._materialized or key in self._files:
+                    self._files[key] = path.basename(obj_path)
+                else:
+                    self.materialize(obj_path, filepath)
+
+    def detach_tree(self, root: str):
+        """Replace files under ``root`` that are hardlinked with private copies.
+
+        Must be called before modifying files under ``root`` in place (e.g. with
+        ``normalize_tree``), so that the changes do not leak into the store.  Copies
+        are made as copy-on-write clones where possible.
+        """
+        logging.info(f"Detaching {root} from file store {self.root}")
+        for dirpath, _, filenames in walk(root):
+            for name in filenames:
+                filepath = path.join(dirpath, name)
+                st = lstat(filepath)
+                if not stat.S_ISREG(st.st_mode) or st.st_nlink == 1:
+                    continue
+                tmp = f"{filepath}.{getpid()}.store-tmp"
+                if not _clonefile(filepath, tmp):
+                    shutil.copy2(filepath, tmp)
+                replace(tmp, filepath)
+
+    def write_ref(self, name: str, roots: List[str]):
+        """Record the objects used by the current build, keeping them from ``gc``.
+
+        Parameters
+        ----------
+        name : str
+            unique name for this build (e.g. the app path).  Replaces any previous
+            ref of the same name.
+        roots : list of str
+            directories the objects were materialized into.  The ref is dropped by
+            ``gc`` once none of them exist anymore.
+        """
+        # count what is actually in the roots, e.g. after --conda-exclude removals
+        used: Dict[str, List[int]] = {}
+        files: Dict[tuple, str] = {}
+        copied = [0, 0]
+        for root in roots:
+            for dirpath, _, filenames in walk(root):
+                for filename in filenames:
+                    st = lstat(path.join(dirpath, filename))
+                    key = self._key(st)
+                    if key in self._files:
+                        files[key] = self._files[key]
+                        used.setdefault(files[key], [st.st_size, 0])[1] += 1
+                    elif key in self._copied:
+                        copied[0] += 1
+                        copied[1] += st.st_size
+        if copied[0]:
+            logging.warning(
+                f"{copied[0]} files ({copied[1] / 1e6:.1f} MB) were copied rather "
+                "than linked from the store, and are not counted as saved"
+            )
+
+        ref_name = hashlib.sha256(name.encode()).hexdigest() + ".json"
+        fd, tmp = tempfile.mkstemp(dir=self.tmp_dir)
+        ref = {
+            "roots": [path.abspath(r) for r in roots],
+            "objects": used,
+            "files": [[*key, obj_name] for key, obj_name in files.items()],
+            "copied": copied,
+        }
+        with open(fd, "w") as f:
+            json.dump(ref, f)
+        replace(tmp, path.join(self.refs_dir, ref_name))
+
+    def _live_refs(self) -> List[dict]:
+        refs = []
+        for ref_name in sorted(listdir(self.refs_dir)):
+            try:
+                with open(path.join(self.refs_dir, ref_name)) as f:
+                    ref = json.load(f)
+            except FileNotFoundError:
+                continue  # removed by gc in the meantime
+            ref["path"] = path.join(self.refs_dir, ref_name)
+            ref["live"] = any(path.exists(r) for r in ref["roots"])
+            refs.append(ref)
+        return refs
+
+    def _iter_objects(self) -> Iterator[str]:
+        for dirpath, _, filenames in walk(self.objects_dir):
+            for name in filenames:
+                yield path.join(dirpath, name)
+
+    def gc(self) -> Tuple[int, int]:
+        """Delete refs whose roots are gone and all objects no longer referenced.
+
+        Objects that are still hardlinked elsewhere are kept regardless.
+
+        Returns
+        -------
+        tuple of int
+            number of objects removed, and number of bytes freed
+        """
+        removed, freed = 0, 0
+        with self.lock(exclusive=True):
+            live = set()
+            for ref in self._live_refs():
+                if ref["live"]:
+                    live.update(ref["objects"])
+                else:
+                    logging.info(f"Dropping stale ref for {', '.join(ref['roots'])}")
+                    remove(ref["path"])
+            for obj_path in self._iter_objects():
+                st = lstat(obj_path)
+                if path.basename(obj_path) in live or st.st_nlink > 1:
+                    continue
+                remove(obj_path)
+                removed += 1
+                freed += st.st_size
+            # leftovers from interrupted ingestion
+            for name in listdir(self.tmp_dir):
+                remove(path.join(self.tmp_dir, name))
+        logging.info(f"Removed {removed} objects ({freed / 1e6:.1f} MB) from store")
+        return removed, freed
+
+    def stats(self) -> Dict[str, float]:
+        """Return deduplication statistics for the store.
+
+        Returns
+        -------
+        dict
+            ``objects`` (number of stored objects), ``stored_bytes`` (size of all
+            objects), ``logical_bytes`` (size of all files linked from the store in
+            live refs), ``saved_bytes``, ``dedup_ratio`` (logical / stored), and
+            ``copied_bytes`` (size of files that had to be copied from the store,
+            which are not included in the other numbers).
+        """
+        with self.lock():
+            objects, stored = 0, 0
+            for obj_path in self._iter_objects():
+                objects += 1
+                stored += lstat(obj_path).st_size
+            live_refs = [ref for ref in self._live_refs() if ref["live"]]
+            logical = sum(
+                size * count
+                for ref in live_refs
+                for size, count in ref["objects"].values()
+            )
+            copied = sum(ref["copied"][1] for ref in live_refs)
+        return {
+            "objects": objects,
+            "stored_bytes": stored,
+            "logical_bytes": logical,
+            "saved_bytes": max(logical - stored, 0),
+            "dedup_ratio": logical / stored if stored else 1.0,
+            "copied_bytes": copied,
+        }
+
+    def log_stats(self):
+        s = self.stats()
+        logging.info(
+            f"File store {self.root}: {s['objects']} objects, "
+            f"{s['stored_bytes'] / 1e6:.1f} MB stored, "
+            f"{s['saved_bytes'] / 1e6:.1f} MB saved "
+            f"(dedup ratio {s['dedup_ratio']:.2f}), "
+            f"{s['copied_bytes'] / 1e6:.1f} MB copied"
+        )
+
+
 def bundle_conda_env(
-    env_dir: str, app_path: str, include: List[str] = [], exclude: List[str] = [],
+    env_dir: str,
+    app_path: str,
+    include: List[str] = [],
+    exclude: List[str] = [],
+    store: Optional[FileStore] = None,
 ):
     """Copy the conda env at ``env_dir`` into the .app at ``app_path``
 
@@ -180,6 +601,9 @@ def bundle_conda_env(
     exclude : list of str, optional
         glob patterns (relative to the base conda environment) to exclude when bundling,
         by default []
+    store : FileStore, optional
+        If provided, files are materialized from this store (as clones or hardlinks)
+        instead of being copied.  by default None
     """
     app_resource_dir = path.join(app_path, "Contents", "Resources")
     if not include:
@@ -192,8 +616,13 @@ def bundle_conda_env(
         logging.info(f"Copying {fullpath} to bundle")
         if path.isdir(fullpath):
             shutil.copytree(
-                fullpath, dest, symlinks=True,
+                fullpath,
+                dest,
+                symlinks=True,
+                copy_function=store.copy if store else shutil.copy2,
             )
+        elif store:
+            store.copy(fullpath, dest)
         else:
             shutil.copy(fullpath, dest)
 
@@ -293,6 +722,7 @@ def create_info_plist(
     version: str = "0.1.0",
     app_author: str = "",
     copyright: str = "",
+    year: str = "",
 ):
     """Create an Info.plist file and copy it to the /Contents folder of app_path.
 
@@ -311,6 +741,8 @@ def create_info_plist(
         App author to use in CFBundleIdentifier, by default will use ``app_name``.
     copyright : str, optional
         String to use for copyright attribution, by default ``{app_name} contributors``
+    year : str, optional
+        Year to use in the copyright notice, by default the current year
     """
     if not app_name:
         app_name = path.basename(app_path).rstrip(".app")
@@ -330,7 +762,7 @@ def create_info_plist(
     template = template.replace("{{ app_author }}", app_author or app_name)
     template = template.replace("{{ app_icon }}", icon_name)
     template = template.replace("{{ app_version }}", version)
-    template = template.replace("{{ year }}", str(datetime.now().year))
+    template = template.replace("{{ year }}", year or str(datetime.now().year))
     template = template.replace(
         "{{ copyright }}", copyright or f"{app_name} contributors"
     )
@@ -391,7 +823,172 @@ def create_exe(app_path: str, pyscript: str = "") -> str:
     return exe_path
 
 
-def make_dmg(app_path: str, keep_app: bool = False) -> str:
+def compile_bytecode(lib_dir: str, env_name: str, ddir: str = ""):
+    """Recompile all .pyc files in ``lib_dir`` using hash-based invalidation.
+
+    Timestamp-based .pyc files embed the mtime of their source file, which both varies
+    between builds and goes stale once the mtimes are changed (by ``normalize_tree``,
+    or by materializing files from a ``FileStore``).  Hash-based .pyc files (PEP 552,
+    python >= 3.7) depend only on the source contents.
+
+    Parameters
+    ----------
+    lib_dir : str
+        path to the ``lib`` folder of a conda environment or app bundle.
+    env_name : str
+        name of the conda environment whose python should compile the bytecode.
+    ddir : str, optional
+        If provided, source paths in the bytecode are recorded relative to this
+        directory instead of ``lib_dir``, so that the bytecode does not depend on
+        where it was built.  by default ""
+    """
+    logging.info(f"Recompiling bytecode in {lib_dir} with hash-based invalidation")
+    args = ["python", "-m", "compileall", "-q", "-f"]
+    args += ["--invalidation-mode", "checked-hash"]
+    if ddir:
+        args += ["-d", ddir]
+    conda_run(args + [lib_dir], env_name)
+
+
+def strip_conda_meta(app_path: str):
+    """Remove build-specific records from the bundled ``conda-meta`` folder.
+
+    ``conda-meta/history`` logs the time and command line of every conda call, and the
+    json record of each package holds absolute paths into the conda package cache.
+    Neither is needed to run the app, and both differ between builds.
+
+    Parameters
+    ----------
+    app_path : str
+        path to mac .app directory being bundled.
+    """
+    meta_dir = path.join(app_path, "Contents", "Resources", "conda-meta")
+    if not path.isdir(meta_dir):
+        return
+    logging.info("Stripping build-specific records from conda-meta")
+    for name in sorted(listdir(meta_dir)):
+        item = path.join(meta_dir, name)
+        if name == "history":
+            contents = ""
+        elif name.endswith(".json"):
+            with open(item) as f:
+                record = json.load(f)
+            record.pop("extracted_package_dir", None)
+            record.pop("package_tarball_full_path", None)
+            record.get("link", {}).pop("source", None)
+            contents = json.dumps(record, indent=2, sort_keys=True) + "\n"
+        else:
+            continue
+        # replace rather than rewrite in place, the file may be a hardlink
+        with open(f"{item}.tmp", "w") as f:
+            f.write(contents)
+        replace(f"{item}.tmp", item)
+
+
+def normalize_tree(root: str, epoch: int):
+    """Normalize timestamps and permissions of ``root`` and everything beneath it.
+
+    All mtimes are set to ``epoch``, directories get mode 755, and files get mode 755
+    if they were executable by their owner or 644 otherwise.  Symlinks are not
+    followed.
+
+    Parameters
+    ----------
+    root : str
+        path to a file or directory (e.g. a mac .app bundle) to normalize.
+    epoch : int
+        timestamp (seconds since the unix epoch) to apply to every item.
+    """
+    logging.info(f"Normalizing timestamps and permissions in {root}")
+
+    def _normalize(item: str):
+        mode = lstat(item).st_mode
+        if not stat.S_ISLNK(mode):
+            if stat.S_ISDIR(mode) or mode & stat.S_IXUSR:
+                chmod(item, 0o755)
+            else:
+                chmod(item, 0o644)
+        utime(item, (epoch, epoch), follow_symlinks=False)
+
+    # bottom-up, so that each directory is touched after its contents
+    for dirpath, dirnames, filenames in walk(root, topdown=False):
+        for name in dirnames + filenames:
+            _normalize(path.join(dirpath, name))
+    _normalize(root)
+
+
+def _hash_file(filepath: str, digest=None):
+    """Update ``digest`` (by default a new sha256) with the contents of ``filepath``."""
+    if digest is None:
+        digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest
+
+
+def content_hash(target: str) -> str:
+    """Return a sha256 digest of the file or directory tree at ``target``.
+
+    Directory trees are hashed in sorted order over relative paths, permission bits,
+    symlink targets, and file contents, so the digest does not depend on timestamps
+    or on the order in which the filesystem lists entries.
+
+    Parameters
+    ----------
+    target : str
+        path to a file (e.g. a .dmg) or directory (e.g. a mac .app bundle).
+
+    Returns
+    -------
+    str
+        hex digest
+    """
+    digest = hashlib.sha256()
+    if not path.isdir(target):
+        _hash_file(target, digest)
+        return digest.hexdigest()
+
+    for dirpath, dirnames, filenames in walk(target):
+        dirnames.sort()
+        for name in sorted(dirnames + filenames):
+            item = path.join(dirpath, name)
+            mode = lstat(item).st_mode
+            relpath = path.relpath(item, target)
+            digest.update(f"{relpath}\0{stat.S_IMODE(mode):o}\0".encode())
+            if stat.S_ISLNK(mode):
+                digest.update(f"link:{readlink(item)}\0".encode())
+            elif stat.S_ISREG(mode):
+                _hash_file(item, digest)
+    return digest.hexdigest()
+
+
+def write_content_hash(target: str) -> str:
+    """Write the ``content_hash`` of ``target`` to ``{target}.sha256``.
+
+    The file uses the same format as ``shasum -a 256``, so CI can look the hash up in
+    an artifact store and skip packaging and uploading artifacts that already exist.
+
+    Parameters
+    ----------
+    target : str
+        path to a (normalized) mac .app bundle.
+
+    Returns
+    -------
+    str
+        hex digest
+    """
+    hexdigest = content_hash(target)
+    with open(f"{target}.sha256", "w") as f:
+        f.write(f"{hexdigest}  {path.basename(target)}\n")
+    logging.info(f"Content hash of {path.basename(target)}: {hexdigest}")
+    return hexdigest
+
+
+def make_dmg(
+    app_path: str, keep_app: bool = False, epoch: Optional[int] = None
+) -> str:
     """Bundle app at ``app_path`` into a .dmg file for distribution.
 
     Will also include a symlink to ``/Applications``.
@@ -403,6 +1000,10 @@ def make_dmg(app_path: str, keep_app: bool = False) -> str:
     keep_app : bool, optional
         Whether to keep an unbundled copy of the app, outside of the .dmg file, or not.
         by default False
+    epoch : int, optional
+        If provided, the DMG contents and the DMG file itself are normalized to this
+        timestamp (see ``normalize_tree``).  Note that ``hdiutil`` may still embed
+        volume metadata that differs between runs.  by default None
     """
     dmg_dir = path.join(path.dirname(app_path), "dmg")
     dmg_file = app_path.replace(".app", ".dmg")
@@ -419,6 +1020,8 @@ def make_dmg(app_path: str, keep_app: bool = False) -> str:
         shutil.copytree(app_path, app_in_dmg)
     else:
         shutil.move(app_path, app_in_dmg)
+    if epoch is not None:
+        normalize_tree(dmg_dir, epoch)
     logging.info("Creating DMG archive...")
     result = subprocess.run(
         ["hdiutil", "create", f"{dmg_file}", "-srcfolder", f"{dmg_dir}"],
@@ -427,22 +1030,26 @@ def make_dmg(app_path: str, keep_app: bool = False) -> str:
     if result.returncode == 0:
         logging.info("DMG successfully created")
         shutil.rmtree(dmg_dir)
+        if epoch is not None:
+            normalize_tree(dmg_file, epoch)
         return dmg_file
     else:
         logging.error(f"DMG creation failed: {result.stderr.decode().strip()}")
         return ""
 
 
-def sign_app(target: str, cert_name: str = "-"):
+def sign_app(target: str, cert_name: str = "-", reproducible: bool = False):
     try:
         if cert_name:
             if cert_name == "-":
                 logging.info(f"No code certificate supplied, using ad-hoc signature")
             else:
                 logging.info(f"Signing code with cert_name: {cert_name}")
-            subprocess.check_call(
-                ["codesign", "--force", "--deep", "-s", cert_name, target]
-            )
+            command = ["codesign", "--force", "--deep", "-s", cert_name]
+            if reproducible:
+                # a secure timestamp would differ on every signing
+                command.append("--timestamp=none")
+            subprocess.check_call(command + [target])
         logging.info(f"Successfully signed {target}")
     except subprocess.CalledProcessError as e:
         logging.error(f"App code signing failed: {e}")
@@ -461,6 +1068,9 @@ def main(
     test: List[str] = [],
     nodmg: bool = False,
     cert_name: str = "-",
+    reproducible: bool = False,
+    store: str = "",
+    store_link: str = "clone",
 ):
     """Main program to bundle a conda env into a mac app.
 
@@ -501,10 +1111,32 @@ def main(
         If provided, will be used to code-sign the app bundle using the (common) name of
         a certificate that must be in the keychain.  By default, ad-hoc code signing is
         used.
+    reproducible : bool, optional
+        Whether to normalize timestamps, permissions and bytecode so that identical
+        inputs produce identical artifacts.  The timestamp used is taken from the
+        ``SOURCE_DATE_EPOCH`` environment variable, if set.  A content hash of the
+        app is written to ``distpath/name.app.sha256`` before the DMG is created.
+        by default False
+    store : str, optional
+        Path to a content-addressed file store shared between builds (see
+        ``FileStore``).  If provided, files in the conda environment and the app bundle
+        are deduplicated against the store.  By default, no store is used.
+    store_link : str, optional
+        How files are materialized from ``store``: "clone" (copy-on-write clones,
+        sharing disk blocks) or "hardlink" (also sharing the page cache), by default
+        "clone"
     """
     logging.info(f'Creating "{name}.app"')
     start_t = time()
 
+    epoch = None
+    if reproducible:
+        epoch = source_date_epoch()
+        logging.info(f"Reproducible build using SOURCE_DATE_EPOCH={epoch}")
+        # inherited by pip (via conda_run) so that it writes hash-based .pyc files
+        environ["SOURCE_DATE_EPOCH"] = str(epoch)
+        environ["PYTHONHASHSEED"] = "0"
+
     # create dist/appname.app/ and all subdirectories
     app_path = create_app_folder(name, distpath, not noconfirm)
     # download and install miniconda into buildpath
@@ -512,17 +1144,47 @@ def main(
     conda_base = install_conda(buildpath)
     # create a new environment and install app named name
     env_dir = create_env(conda_base, name, py, pip_install, not noconfirm)
+    hash_pyc = tuple(int(x) for x in py.split(".")) >= (3, 7)
     # move newly-created environment into dist/appname.app/Contents/Resources
-    bundle_conda_env(env_dir, app_path, conda_include, conda_exclude)
+    if store:
+        # files materialized from the store get the mtime of the stored object
+        if hash_pyc:
+            compile_bytecode(path.join(env_dir, "lib"), name)
+        else:
+            logging.warning(f"Bytecode will be recompiled at runtime for python {py}")
+        file_store = FileStore(store, store_link)
+        with file_store.lock():
+            file_store.load_refs()
+            file_store.dedupe_tree(env_dir)
+            bundle_conda_env(
+                env_dir, app_path, conda_include, conda_exclude, file_store
+            )
+            file_store.write_ref(app_path, [env_dir, app_path])
+        file_store.log_stats()
+    else:
+        bundle_conda_env(env_dir, app_path, conda_include, conda_exclude)
     # put icon into dist/appname.app/Contents/Resources
     if icon:
         icon_basename = copy_icon(app_path, path.abspath(path.expanduser(icon)))
     else:
         icon_basename = ""
     # create Info.plist in dist/appname.app/Contents
-    create_info_plist(app_path, name, icon_basename)
+    if reproducible:
+        year = str(datetime.fromtimestamp(epoch, tz=timezone.utc).year)
+        create_info_plist(app_path, name, icon_basename, year=year)
+    else:
+        create_info_plist(app_path, name, icon_basename)
     # create dist/appname.app/Contents/MacOS/appname script
     exe_path = create_exe(app_path)
+    # make bytecode and conda records independent of the build
+    if reproducible:
+        strip_conda_meta(app_path)
+        if hash_pyc:
+            lib_dir = path.join("Contents", "Resources", "lib")
+            ddir = path.join(path.basename(app_path), lib_dir)
+            compile_bytecode(path.join(app_path, lib_dir), name, ddir)
+        else:
+            logging.warning(f"Bytecode will not be reproducible for python {py}")
 
     # execute tests, if present
     if test:
@@ -535,13 +1197,22 @@ def main(
             logging.info("Running test: {}".format(" ".join(command)))
             subprocess.check_call(command)
 
+    # signing and normalizing modify files in place, which must not reach the store
+    if store and (cert_name or reproducible):
+        file_store.detach_tree(app_path)
+
     # code signing
     if cert_name:
-        sign_app(app_path, cert_name)
+        sign_app(app_path, cert_name, reproducible)
+
+    if reproducible:
+        normalize_tree(app_path, epoch)
+        # hash the app rather than the dmg, which hdiutil does not create reproducibly
+        write_content_hash(app_path)
 
     # bundle into a dmg
     if not nodmg:
-        make_dmg(app_path)
+        make_dmg(app_path, epoch=epoch)
     logging.info(f"App created in {int(time() - start_t)} seconds")
 
 
@@ -564,6 +1235,21 @@ if __name__ == "__main__":
             make_dmg(values[0], keep_app=False)
             sys.exit()
 
+    class StoreGC(argparse.Action):
+        def __call__(self, parser, args, values, option_string=None):
+            logging.basicConfig(level=args.log_level)
+            FileStore(values[0]).gc()
+            sys.exit()
+
+    class StoreStats(argparse.Action):
+        def __call__(self, parser, args, values, option_string=None):
+            for key, value in FileStore(values[0]).stats().items():
+                if key == "dedup_ratio":
+                    print(f"{key}: {value:.2f}")
+                else:
+                    print(f"{key}: {value:,}")
+            sys.exit()
+
     parser = argparse.ArgumentParser(formatter_class=argparse.RawTextHelpFormatter)
 
     parser.add_argument(
@@ -648,6 +1334,36 @@ if __name__ == "__main__":
         metavar="KEY",
         default="-",
     )
+    parser.add_argument(
+        "--reproducible",
+        help=(
+            "Normalize timestamps, permissions and bytecode so that identical\n"
+            "inputs produce identical apps (honors SOURCE_DATE_EPOCH), and\n"
+            "write a content hash of the app to <app_name>.app.sha256"
+        ),
+        action="store_true",
+    )
+    parser.add_argument(
+        "--store",
+        help=(
+            "Content-addressed file store shared between builds. Files in\n"
+            "the conda env and app bundle are stored once and materialized\n"
+            "as clones or hardlinks."
+        ),
+        metavar="PATH",
+        default="",
+    )
+    parser.add_argument(
+        "--store-link",
+        help=(
+            "How to materialize files from '--store': 'clone' (copy-on-write,\n"
+            "shares disk blocks) or 'hardlink' (also shares the page cache).\n"
+            "(default: clone)"
+        ),
+        metavar="MODE",
+        default="clone",
+        choices=["clone", "hardlink"],
+    )
     parser.add_argument(
         "--test",
         help=(
@@ -683,6 +1399,20 @@ if __name__ == "__main__":
         metavar="APP_PATH",
         nargs=1,
     )
+    parser.add_argument(
+        "--store-gc",
+        help="Remove unreferenced objects from a file store, then exit.",
+        action=StoreGC,
+        metavar="STORE_PATH",
+        nargs=1,
+    )
+    parser.add_argument(
+        "--store-stats",
+        help="Print deduplication stats of a file store, then exit.",
+        action=StoreStats,
+        metavar="STORE_PATH",
+        nargs=1,
+    )
 
     args = parser.parse_args()
     logging.basicConfig(level=args.log_level)
@@ -690,6 +1420,8 @@ if __name__ == "__main__":
     kwargs.pop("log_level")
     kwargs.pop("clean")
     kwargs.pop("make_dmg")
+    kwargs.pop("store_gc")
+    kwargs.pop("store_stats")
     icon = kwargs.pop("icon")
     kwargs["icon"] = icon.name if icon else None
     main(**kwargs)